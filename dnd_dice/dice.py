@@ -1,15 +1,32 @@
 #!/bin/python
 
-import itertools
+import bisect
+import functools
 import json
 import os
-import random
+import pathlib
+import pickle
+import re
 
-DATA = os.getenv('HOME') + '/.xdg/data/dnd_dice.json'
+from typing import Union
+
+import numpy as np
+
+DATA = os.environ['HOME'] + '/.xdg/data/dnd_dice.json'
+_RNG = np.random.default_rng()
+_CLEAN_RE = re.compile(r'[ -]')
+_CLEAN_SUBS = {' ': '', '-': '+-'}
+# A plain number or dice literal, which never needs a macro lookup.
+_ATOM = re.compile(r'\d*d\d+|-?\d+')
 
 class Value:
 
-  def __init__(self, val):
+  fixed: bool
+  val: int
+  count: int
+  sides: int
+
+  def __init__(self, val: Union[int, str]) -> None:
     if isinstance(val, int):
       self.fixed = True
       self.val = val
@@ -24,16 +41,7 @@ class Value:
         self.fixed = True
         self.val = int(val)
 
-  def roll(self):
-    if self.fixed:
-      self.parts = [self.val]
-    else:
-      self.parts = [random.randint(1, self.sides) for _ in range(self.count)]
-
-  def int_val(self):
-    return sum(self.parts)
-
-  def __str__(self):
+  def __str__(self) -> str:
     if self.fixed:
       return str(self.val)
     else:
@@ -42,39 +50,88 @@ class Value:
 
 class Roller:
 
-  def __init__(self):
+  @functools.cached_property
+  def data(self) -> dict[str, str]:
+    """Load the macros on first use, via a pickled copy while it is newer than DATA."""
+    cache = pathlib.Path(DATA + '.pkl')
+    if cache.exists() and cache.stat().st_mtime >= os.path.getmtime(DATA):
+      data: dict[str, str] = pickle.loads(cache.read_bytes())
+      return data
     with open(DATA) as f:
-      self.data = json.load(f)
+      data = json.load(f)
+    try:
+      cache.write_bytes(pickle.dumps(data))
+    except OSError:
+      pass
+    return data
 
-  def resolve(self, val):
+  @functools.cached_property
+  def _sorted_keys(self) -> list[str]:
+    return sorted(self.data)
+
+  @functools.cached_property
+  def _resolved(self) -> dict[str, tuple[tuple[Value, ...], tuple[str, ...]]]:
+    # Per-instance cache of cleaned expression -> (Values, macro expansions).
+    return {}
+
+  def resolve(self, val: str) -> tuple[Value, ...]:
+    values, expansions = self._resolve(val)
+    # Show the macro expansions on every roll, not just the first one.
+    for expanded in expansions:
+      print(expanded)
+    return values
+
+  def _resolve(self, val: str) -> tuple[tuple[Value, ...], tuple[str, ...]]:
+    if _ATOM.fullmatch(val):
+      return (Value(val),), ()
     val = self.clean(val)
-    self.parts = []
-    matches = [i for i in self.data if i.startswith(val)]
+    cache = self._resolved
+    if val not in cache:
+      if len(cache) >= 1024:
+        cache.clear()
+      cache[val] = self._expand(val)
+    return cache[val]
+
+  def _expand(self, val: str) -> tuple[tuple[Value, ...], tuple[str, ...]]:
+    # Keys sharing a prefix are contiguous once sorted; two is enough to detect ambiguity.
+    start = bisect.bisect_left(self._sorted_keys, val)
+    matches = [i for i in self._sorted_keys[start:start + 2] if i.startswith(val)]
     if len(matches) > 1:
-      return "More than one match. Cannot resolve."
+      raise ValueError("More than one match. Cannot resolve.")
     if matches:
       expanded = f'{matches} = {self.data[matches[0]]}'
-      print(expanded)
-      return self.resolve(self.data[matches[0]])
+      values, expansions = self._resolve(self.data[matches[0]])
+      return values, (expanded, *expansions)
     else:
       if '+' in val:
-        return itertools.chain.from_iterable(self.resolve(v) for v in val.split('+'))
+        out: list[Value] = []
+        notes: list[str] = []
+        for v in val.split('+'):
+          values, expansions = self._resolve(v)
+          out.extend(values)
+          notes.extend(expansions)
+        return tuple(out), tuple(notes)
       else:
-        return [Value(val)]
+        return (Value(val),), ()
 
-  def clean(self, val):
-    val = val.replace(' ', '')
-    val = val.replace('-', '+-')
-    val = val.replace('++', '+')
-    return val
+  def clean(self, val: str) -> str:
+    val = _CLEAN_RE.sub(lambda m: _CLEAN_SUBS[m.group()], val)
+    return val.replace('++', '+')
 
-  def roll(self, val):
+  def roll(self, val: str) -> list:
     parts = list(self.resolve(val))
-    for p in parts:
-      p.roll()
+    # Lay every group out in one flat array; a fixed value is a one-slot group.
+    # The resolved Values are cached and shared between rolls so results stay out of them.
+    counts = np.array([1 if p.fixed else p.count for p in parts])
+    highs = np.repeat([2 if p.fixed else p.sides + 1 for p in parts], counts)
+    # Most dice fit in a byte; widen only when a die or fixed value does not.
+    small = all(0 <= p.val < 256 if p.fixed else p.sides < 256 for p in parts)
+    flat = _RNG.integers(1, highs, dtype=np.uint8 if small else np.int32)
+    starts = np.cumsum(counts) - counts
+    fixed = [i for i, p in enumerate(parts) if p.fixed]
+    flat[starts[fixed]] = [parts[i].val for i in fixed]
     return [
       [str(p) for p in parts],
-      [p.parts for p in parts],
-      sum(p.int_val() for p in parts),
+      [group.tolist() for group in np.split(flat, starts[1:])],
+      int(flat.sum(dtype=np.int64)),
     ]
-
@@ -0,0 +1,14 @@
+#!/bin/python
+
+# Optional: compile dice.py to a C extension with mypyc.
+#   python setup.py build_ext --inplace
+# The compiled module is picked up by `import dice` ahead of dice.py; delete the .so to fall back.
+
+from mypyc.build import mypycify
+from setuptools import setup
+
+setup(
+  name='dnd_dice',
+  py_modules=['dice'],
+  ext_modules=mypycify(['dice.py']),
+)
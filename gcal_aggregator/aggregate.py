@@ -15,27 +15,30 @@ To add events to the shared calendar:
 * Click "Get shareable link" and share that with the public account so it can add it.
 """
 
-
-# TODO: Periodic full refresh and sync
-
 import asyncio
 import datetime
-import json
+import functools
+import heapq
 import logging
+import logging.handlers
 import pathlib
+import queue
+import random
 import time
 import uuid
+import zoneinfo
 
-from typing import Optional
+from typing import Callable, Coroutine, Optional
 
 import aiohttp
 import click
-import dateutil.parser
-import dateutil.tz
-import pytz
-import tenacity
+import google_auth_httplib2
+import httplib2
+import orjson
 
 import googleapiclient.errors
+import googleapiclient.http
+import googleapiclient.model
 from google.auth.exceptions import RefreshError
 from googleapiclient.discovery import build, Resource
 from google_auth_oauthlib.flow import InstalledAppFlow
@@ -49,23 +52,98 @@ SCOPES = [
     "https://www.googleapis.com/auth/calendar.events",
     "https://www.googleapis.com/auth/calendar",
 ]
+# How far ahead to sync events.
+EVENT_WINDOW = datetime.timedelta(days=60)
+# Seconds between full resyncs, which catch any push notifications Google dropped.
+SAFETY_POLL = 3600
+# Seconds to wait after a change notification before syncing, to coalesce bursts.
+SYNC_DEBOUNCE = 2
+# Seconds before a watch channel expires to renew it.
+WATCH_RENEW_EARLY = 3600
+# Event fields used by the aggregator; the rest are left out of list responses.
+EVENT_FIELDS = (
+    "nextPageToken,nextSyncToken,"
+    "items(id,status,summary,description,location,start,end,kind,recurrence,organizer(email))"
+)
+# Max requests in one Calendar API batch request.
+BATCH_SIZE = 50
+# Retries, with exponential backoff, for rate limited or failed API requests.
+NUM_RETRIES = 5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_REASONS = (b"rateLimitExceeded", b"userRateLimitExceeded")
+# Geographic tz database areas, used to skip aliases like Etc/GMT+8 or US/Pacific.
+TZ_AREAS = {"Africa", "America", "Antarctica", "Asia", "Atlantic", "Australia", "Europe", "Indian", "Pacific"}
+# Headers Google sends with watch notifications.
+WEBHOOK_HEADERS = ("X-Goog-Channel-ID", "X-Goog-Resource-ID", "X-Goog-Resource-State", "X-Goog-Channel-Token")
+# Placeholder for absent Event keys, distinct from a key set to None.
+MISSING = object()
+
+
+@functools.lru_cache(maxsize=2)
+def offset_timezones(day: datetime.date) -> dict[datetime.timedelta, str]:
+    """Map UTC offsets to the first common TZ name with that offset on a given day.
+
+    Keyed by day so DST changes are picked up by a long running daemon.
+    """
+    common = ["America/Los_Angeles", "America/New_York", *sorted(
+        name for name in zoneinfo.available_timezones()
+        if name.split("/")[0] in TZ_AREAS
+    )]
+    now = datetime.datetime.now()
+    zones: dict[datetime.timedelta, str] = {}
+    for timezone in common:
+        zones.setdefault(zoneinfo.ZoneInfo(timezone).utcoffset(now), timezone)
+    return zones
 
 
 def tz_name(timeobj: datetime.datetime) -> str:
     """Map a datetime object to a common TZ name."""
-    common = ["America/Los_Angeles", "America/New_York"] + pytz.common_timezones
+    # Pacific offsets map to LA whether or not DST is currently in effect.
     offset = timeobj.utcoffset()
-    now = datetime.datetime.now()
-    for timezone in common:
-        if pytz.timezone(timezone).utcoffset(now) == offset:
-            return timezone
-    if timeobj.tzinfo == dateutil.tz.tzoffset(None, -28800):
-        return "America/Los_Angeles"
-    if timeobj.tzinfo == dateutil.tz.tzoffset(None, -25200):
+    if offset in (datetime.timedelta(hours=-8), datetime.timedelta(hours=-7)):
         return "America/Los_Angeles"
+    if offset in (zones := offset_timezones(datetime.date.today())):
+        return zones[offset]
     raise RuntimeError("TZ not found for", timeobj)
 
 
+def retryable(exception: Optional[Exception]) -> bool:
+    """Return if a failed request is worth retrying: rate limits and server errors."""
+    if not isinstance(exception, googleapiclient.errors.HttpError):
+        return False
+    status = exception.resp.status
+    if status == 403:
+        return any(reason in (exception.content or b"") for reason in RETRY_REASONS)
+    return status in RETRY_STATUSES
+
+
+def event_span(item: dict) -> tuple[Optional[datetime.datetime], Optional[datetime.datetime]]:
+    """Return the start and end of a raw event; all-day dates are taken as UTC midnight."""
+    span = []
+    for time_s in ("start", "end"):
+        when = item.get(time_s, {})
+        if "dateTime" in when:
+            span.append(datetime.datetime.fromisoformat(when["dateTime"]))
+        elif "date" in when:
+            span.append(datetime.datetime.fromisoformat(when["date"]).replace(tzinfo=datetime.timezone.utc))
+        else:
+            span.append(None)
+    return span[0], span[1]
+
+
+class OrjsonModel(googleapiclient.model.JsonModel):
+    """JsonModel which parses API responses with orjson."""
+
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return super().deserialize(content)
+        if self._data_wrapper and "data" in body:
+            body = body["data"]
+        return body
+
+
 class Event(dict):
     """Google Calendar Event wrapper."""
 
@@ -79,43 +157,49 @@ class Event(dict):
         # Convert date strings to datetime objects for TZ-aware equality.
         for time_s in ("start", "end"):
             if self.get(time_s, {}).get("dateTime", None):
-                self[f"{time_s}_dt"] = dateutil.parser.isoparse(self[time_s]["dateTime"])
+                self[f"{time_s}_dt"] = datetime.datetime.fromisoformat(self[time_s]["dateTime"])
         # Add calendar metadata.
         if addition:
             self.setdefault("description", "")
             self["description"] += "<hr /><span>" + addition + "</span>"
+        # Precompute the values used for equality and hashing.
+        # Lists (recurrence) are not hashable; store them as tuples.
+        self.key = tuple(
+            tuple(v) if isinstance(v := self.get(k, MISSING), list) else v
+            for k in self.KEYS
+        )
 
     def __eq__(self, other: object) -> bool:
         """Return if events are equal, considering only public information."""
-        msg = f"Cannot compare types {type(self)} to type {type(other)}"
-        assert isinstance(other, type(self)), msg
-        diff_contains = [key for key in self.KEYS if (key in self) != (key in other)]
-        if diff_contains:
-            return False
-        diff_vals = [key for key in self.KEYS if self.get(key, None) != other.get(key, None)]
-        if diff_vals:
-            return False
-        return True
+        # The message is only formatted if the assert fails.
+        assert isinstance(other, type(self)), f"Cannot compare types {type(self)} to type {type(other)}"
+        return self is other or self.key == other.key
 
     def __hash__(self):
-        return hash(((k, self[k]) for k in self.KEYS))
+        return hash(self.key)
 
-    @tenacity.retry(stop=tenacity.stop_after_attempt(3), wait=tenacity.wait_fixed(5))
-    def delete(self) -> None:
-        """Delete this event from Google Calendar."""
+    def delete_request(self) -> googleapiclient.http.HttpRequest:
+        """Return an unexecuted request deleting this event from Google Calendar."""
         calendar_id = self["organizer"]["email"]
-        self.service().events().delete(calendarId=calendar_id, eventId=self["id"]).execute()
+        return self.service().events().delete(calendarId=calendar_id, eventId=self["id"])
 
-    def add(self, dest_cal: "Calendar") -> bool:
-        """Add this event to a Google Calendar."""
+    def should_add(self, dest_cal: "Calendar", existing: Optional[set["Event"]] = None) -> bool:
+        """Return if this event should be added to a calendar."""
         # Check for existance first to avoid creating duplicates.
-        if self in dest_cal.future_events():
+        if existing is None:
+            existing = set(dest_cal.future_events())
+        if self in existing:
             logging.info("Skipping add; event is already in the calendar.")
             return False
         now = datetime.datetime.now(datetime.timezone.utc)
         if "recurrence" not in self and "end_dt" in self and self["end_dt"] < now:
             logging.info("Skipping add; event already ended.")
             return False
+        return True
+
+    @functools.cached_property
+    def insert_body(self) -> dict:
+        """Return the request body used to copy this event, built once per event."""
         body = {key: self[key] for key in self.KEYS if key in self}
         # Convert datetime back to a string.
         for time_s in ("start", "end"):
@@ -130,8 +214,11 @@ class Event(dict):
                 body[time_s] = self[time_s]
             else:
                 raise ValueError(f"Could not find start and end time: {self!r}")
-        self.service().events().insert(calendarId=dest_cal.cid, body=body).execute()
-        return True
+        return body
+
+    def insert_request(self, dest_cal: "Calendar") -> googleapiclient.http.HttpRequest:
+        """Return an unexecuted request adding this event to a Google Calendar."""
+        return self.service().events().insert(calendarId=dest_cal.cid, body=self.insert_body)
 
 
 class Calendar:
@@ -142,11 +229,14 @@ class Calendar:
         self.config = config
         self.service = service
         self.watch_token = None
+        # Incremental sync state: the last sync token and the raw events it covers, by ID.
+        self.sync_token: Optional[str] = None
+        self.items: dict[str, dict] = {}
 
     def __repr__(self):
         return f"{self.calendar} => {self.destinations!r}"
 
-    @property
+    @functools.cached_property
     def destinations(self) -> list[str]:
         """"Return where events from this calendar should be published."""
         dest_names = self.config["sources"][self.cid]["destinations"]
@@ -158,7 +248,7 @@ class Calendar:
         """"Return the calendar name."""
         return self.calendar.get("summary", "")
 
-    @property
+    @functools.cached_property
     def cid(self) -> str:
         """Return the calendar ID."""
         return self.calendar["id"]
@@ -171,38 +261,113 @@ class Calendar:
     def __hash__(self) -> int:
         return hash(self.calendar["id"])
 
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Calendar) and self.cid == other.cid
+
     def future_events(self) -> list[Event]:
         """Return future events for this calendar."""
-        if self.is_owner:
-            addition = ""
-            max_results = 250
-        else:
-            source_tag = self.config["sources"][self.cid]["tag"]
-            addition = f"Source: {source_tag}"
-            max_results = self.config["max_results"]
-
+        request = self.list_request()
+        try:
+            return self.parse_events(self.all_pages(request, request.execute(num_retries=NUM_RETRIES)))
+        except googleapiclient.errors.HttpError as e:
+            if not self.sync_expired(e):
+                raise
+            return self.future_events()
+
+    def list_request(self) -> googleapiclient.http.HttpRequest:
+        """Return an unexecuted request listing future events for this calendar.
+
+        Once a sync token is known, only changes since the last listing are requested.
+        """
+        max_results = 2500 if self.is_owner else self.config["max_results"]
+        if self.sync_token is not None:
+            return self.service().events().list(
+                calendarId=self.cid,
+                syncToken=self.sync_token,
+                maxResults=max_results,
+                fields=EVENT_FIELDS,
+            )
         now = datetime.datetime.utcnow().isoformat() + "Z" # "Z" indicates UTC time
-        end = (datetime.datetime.utcnow() + datetime.timedelta(days=60)).isoformat() + "Z"
-        response = self.service().events().list(
+        end = (datetime.datetime.utcnow() + EVENT_WINDOW).isoformat() + "Z"
+        return self.service().events().list(
             calendarId=self.cid,
             timeMin=now,
             timeMax=end,
             maxResults=max_results,
-        ).execute()
+            fields=EVENT_FIELDS,
+        )
+
+    def all_pages(self, request: googleapiclient.http.HttpRequest, response: dict) -> dict:
+        """Return an events list response with the items of any further pages merged in.
+
+        Only owned calendars are paged through; a complete listing is needed to avoid
+        duplicate copies. Source calendars stay capped at their configured max_results.
+        """
+        if not self.is_owner:
+            return response
+        items = response.get("items", [])
+        while (request := self.service().events().list_next(request, response)) is not None:
+            response = request.execute(num_retries=NUM_RETRIES)
+            items.extend(response.get("items", []))
+        # The last page carries the sync token.
+        response["items"] = items
+        return response
+
+    def sync_expired(self, error: Exception) -> bool:
+        """Return if an error means the sync token expired, dropping the token if so."""
+        if self.sync_token is None or not isinstance(error, googleapiclient.errors.HttpError):
+            return False
+        if error.resp.status != 410:
+            return False
+        logging.info(f"Sync token expired for {self.name}; doing a full sync.")
+        self.sync_token = None
+        return True
+
+    def parse_events(self, response: dict) -> list[Event]:
+        """Return the Events from an events list response, merging in incremental changes."""
+        if self.sync_token is None:
+            self.items = {}
+        for item in response.get("items", []):
+            if item["status"] == "cancelled":
+                self.items.pop(item["id"], None)
+            else:
+                self.items[item["id"]] = item
+        # Not set when the results are paged; the next listing is then a full one.
+        self.sync_token = response.get("nextSyncToken")
+
+        if self.is_owner:
+            addition = ""
+        else:
+            source_tag = self.config["sources"][self.cid]["tag"]
+            addition = f"Source: {source_tag}"
+        # Incremental changes are not limited to the time window so filter them here.
+        # Events which have ended are dropped from the cache so it does not grow without bound.
+        now = datetime.datetime.now(datetime.timezone.utc)
+        end = now + EVENT_WINDOW
+        kept = {}
+        window = []
+        for item_id, item in self.items.items():
+            start, stop = event_span(item)
+            if "recurrence" not in item and stop is not None and stop <= now:
+                continue
+            kept[item_id] = item
+            if "recurrence" in item or start is None or start < end:
+                window.append(item)
+        self.items = kept
         # Dedupe events if needed.
-        return list({Event(event, self.service, addition) for event in response.get("items", []) if event["status"] != "cancelled"})
+        return list({Event(item, self.service, addition) for item in window})
 
-    def watch(self) -> None:
-        """Add a webhook callback to watch a calendar for changes."""
+    def watch_request(self) -> googleapiclient.http.HttpRequest:
+        """Return an unexecuted request adding a webhook callback to watch a calendar for changes."""
         body = {
             "type": "webhook",
             "address": self.config["watch_url"],
             "token": self.cid,
             "id": str(uuid.uuid4()),
         }
-        self.watch_token = self.service().events().watch(calendarId=self.cid, body=body).execute()
         nick = self.config["sources"][self.cid]["name"]
         logging.debug(f"Requested watch for {nick} ({self.cid} {body['id']})")
+        return self.service().events().watch(calendarId=self.cid, body=body)
 
     def watch_stop(self) -> None:
         """Remove a calendar watch."""
@@ -232,6 +397,10 @@ class GCalAggregator:
         self.dst_src: dict[Calendar, list[Calendar]] = {}
         self.src_cals: set[Calendar] = set()
         self.dst_cals: set[Calendar] = set()
+        self.cal_by_cid: dict[str, Calendar] = {}
+        self.src_dsts: dict[str, list[Calendar]] = {}
+        self.cal_list: list[dict] = []
+        self.cal_list_etag: Optional[str] = None
 
         self.lock = asyncio.Lock()
 
@@ -246,78 +415,224 @@ class GCalAggregator:
         if unused_destinations := have_destinations - want_destinations:
             raise ValueError(f"validate_config: {unused_destinations=}")
 
-    def load_calendars(self) -> None:
+    async def load_calendars(self) -> None:
         """Load calendar lists and managed calendar events."""
-        self.dst_src = self.get_cals()
+        # The Google client blocks; run it in a thread so the event loop keeps serving.
+        self.dst_src = await asyncio.to_thread(self.get_cals)
         self.dst_cals = set(self.dst_src.keys())
-        for cal in self.dst_cals:
-            events = cal.future_events()
-            if cal in self.events and sorted(events) != sorted(self.events[cal]):
-                logging.warning("Found discrepancies in events for", cal)
-            self.events[cal] = events
-        src_cals = set()
-        for srcs in self.dst_src.values():
-            src_cals.update(srcs)
+        src_dsts: dict[str, list[Calendar]] = {}
+        for dst, srcs in self.dst_src.items():
+            for src in srcs:
+                src_dsts.setdefault(src.cid, []).append(dst)
+        src_cals = {src for srcs in self.dst_src.values() for src in srcs}
         self.src_cals = src_cals
+        self.src_dsts = src_dsts
+        self.cal_by_cid = {cal.cid: cal for cal in src_cals}
 
-        for cal in self.src_cals:
-            self.events[cal] = cal.future_events()
+        loaded = await asyncio.to_thread(self.batch_future_events, self.dst_cals | self.src_cals)
+        for cal in self.dst_cals:
+            events = loaded[cal]
+            if cal in self.events and set(events) != set(self.events[cal]):
+                logging.warning(f"Found discrepancies in events for {cal.name}")
+        self.events.update(loaded)
+
+    def batch_future_events(self, cals: set[Calendar]) -> dict[Calendar, list[Event]]:
+        """Return future events for many calendars, using batched list requests."""
+        results: dict[Calendar, list[Event]] = {}
+
+        def store(
+            cal: Calendar,
+            request: googleapiclient.http.HttpRequest,
+            request_id: str,
+            response: dict,
+            exception: Optional[Exception],
+        ) -> None:
+            if exception is None:
+                results[cal] = cal.parse_events(cal.all_pages(request, response))
+            elif cal.sync_expired(exception):
+                results[cal] = cal.future_events()
+            else:
+                raise exception
+
+        requests = [(cal, cal.list_request()) for cal in cals]
+        self.execute_batched([(request, functools.partial(store, cal, request)) for cal, request in requests])
+        return results
+
+    def execute_batched(self, requests: list[tuple[googleapiclient.http.HttpRequest, Callable]]) -> None:
+        """Execute requests in batches.
+
+        Each callback is called with (request_id, response, exception) for its request.
+        Requests which fail with a retryable error are resent, with backoff, before
+        their callback sees the error.
+        """
+        for i in range(0, len(requests), BATCH_SIZE):
+            pending = requests[i:i + BATCH_SIZE]
+            for attempt in range(NUM_RETRIES + 1):
+                retry = []
+
+                def collect(
+                    request: googleapiclient.http.HttpRequest,
+                    callback: Callable,
+                    request_id: str,
+                    response: dict,
+                    exception: Optional[Exception],
+                ) -> None:
+                    if attempt < NUM_RETRIES and retryable(exception):
+                        retry.append((request, callback))
+                    else:
+                        callback(request_id, response, exception)
+
+                batch = self.service().new_batch_http_request()
+                for request, callback in pending:
+                    batch.add(request, callback=functools.partial(collect, request, callback))
+                batch.execute()
+                if not retry:
+                    break
+                pending = retry
+                time.sleep(min(2 ** attempt + random.random(), 60))
+
+    def batch_watch(self, cals: list[Calendar]) -> list[Calendar]:
+        """Start or renew watches on many calendars, using batched requests.
+
+        Replaced channels are stopped once their renewal succeeds.
+        Return the calendars whose watch request failed; they keep any existing watch.
+        """
+        failed = []
+        replaced = []
+
+        def watched(cal: Calendar, request_id: str, response: dict, exception: Optional[Exception]) -> None:
+            if exception is not None:
+                logging.warning(f"Failed to watch {cal.name}: {exception}")
+                failed.append(cal)
+                return
+            if cal.watch_token is not None:
+                replaced.append(cal.watch_token)
+            cal.watch_token = response
+
+        def stopped(request_id: str, response: dict, exception: Optional[Exception]) -> None:
+            if exception is not None:
+                logging.debug(f"Failed to stop a replaced watch: {exception}")
+
+        self.execute_batched([(cal.watch_request(), functools.partial(watched, cal)) for cal in cals])
+        # Stop the old channels so Google does not send duplicate notifications until they expire.
+        self.execute_batched([(self.service().channels().stop(body=token), stopped) for token in replaced])
+        return failed
+
+    def calendar_list(self) -> list[dict]:
+        """Return all calendar list entries, reusing the last list if Google says it is unchanged."""
+        calendar_list = self.service().calendarList()
+        request = calendar_list.list(showHidden=True, maxResults=250)
+        if self.cal_list_etag is not None:
+            request.headers["If-None-Match"] = self.cal_list_etag
+        try:
+            resp = request.execute(num_retries=NUM_RETRIES)
+        except googleapiclient.errors.HttpError as e:
+            if e.resp.status != 304:
+                raise
+            return self.cal_list
+        items = resp["items"]
+        # Only a single page list can be checked with its ETag.
+        self.cal_list_etag = None if "nextPageToken" in resp else resp.get("etag")
+        while (request := calendar_list.list_next(request, resp)) is not None:
+            request.headers.pop("If-None-Match", None)
+            resp = request.execute(num_retries=NUM_RETRIES)
+            items.extend(resp["items"])
+        self.cal_list = items
+        return items
 
     def get_cals(self) -> dict[Calendar, list[Calendar]]:
         """Return a mapping of destination calendar to all sources for it."""
-        resp = self.service().calendarList().list(showHidden=True).execute()
-        calendars = [Calendar(c, self.service, self.config) for c in resp["items"]]
+        items = self.calendar_list()
+        # Reuse known Calendars so their sync tokens carry over and a reload only pulls changes.
+        known = {cal.cid: cal for cal in self.dst_cals | self.src_cals}
+        calendars = []
+        for item in items:
+            if (cal := known.get(item["id"])) is not None:
+                cal.calendar = item
+            else:
+                cal = Calendar(item, self.service, self.config)
+            calendars.append(cal)
 
         own_cals = [c for c in calendars if c.is_owner]
         dst_cals = [c for c in own_cals if c.cid in self.config["destinations"]]
 
-        found_dsts = [c.cid for c in dst_cals]
+        found_dsts = {c.cid for c in dst_cals}
         if (missing_dsts := [cid for cid in self.config["destinations"] if cid not in found_dsts]):
             logging.warning(f"get_cals: {missing_dsts=}")
 
         # other_cals = [c for c in calendars if not c.is_owner]
         src_cals = [c for c in calendars if c.cid in self.config["sources"]]
 
-        found_srcs = [c.cid for c in src_cals]
+        found_srcs = {c.cid for c in src_cals}
         if (missing_srcs := [cid for cid in self.config["sources"] if cid not in found_srcs]):
             logging.warning(f"get_cals: {missing_srcs=}")
 
-        # Map destination calendars to their source calendars.
-        dst_src = {
-            dst: [src for src in src_cals if dst.cid in src.destinations]
-            for dst in dst_cals
-        }
+        # Map destination calendars to their source calendars in one pass over the sources.
+        dst_src: dict[Calendar, list[Calendar]] = {dst: [] for dst in dst_cals}
+        dst_by_cid = {dst.cid: dst for dst in dst_cals}
+        for src in src_cals:
+            for cid in src.destinations:
+                if (dst := dst_by_cid.get(cid)) is not None:
+                    dst_src[dst].append(src)
 
         return dst_src
 
     async def sync_calendar(self, cal: Calendar) -> None:
         """Sync one calendar, refreshing its event data."""
-        self.events[cal] = cal.future_events()
         async with self.lock:
-            self.sync_calendars()
+            self.events[cal] = await asyncio.to_thread(cal.future_events)
+            # Mutations block and may back off; keep them off the event loop.
+            await asyncio.to_thread(self.sync_calendars, cal)
 
-    def sync_calendars(self) -> None:
-        """Sync events to public calendars."""
+    def sync_calendars(self, changed: Optional[Calendar] = None) -> None:
+        """Sync events to public calendars.
+
+        If `changed` is given, only the destinations fed by that calendar are synced.
+        """
         events = self.events
 
         now = datetime.datetime.now(datetime.timezone.utc)
         for dst in self.dst_src:
+            current = []
             for event in events[dst]:
-                if "recurrence" not in event and event["end_dt"] < now:
+                if "recurrence" not in event and "end_dt" in event and event["end_dt"] < now:
                     logging.info(f'Soft drop {event["summary"]} from {dst.name}')
-                    self.events[dst].remove(event)
-
-        for dst, srcs in self.dst_src.items():
-            drop = [e for e in events[dst] if not any(e in events[src] for src in srcs)]
-            add = [e for src in srcs for e in events[src] if e not in events[dst]]
+                else:
+                    current.append(event)
+            events[dst] = current
+
+        mutations = []
+        dsts = self.dst_src if changed is None else self.src_dsts.get(changed.cid, [])
+        for dst in dsts:
+            srcs = self.dst_src[dst]
+            src_events = set().union(*(events[src] for src in srcs))
+            dst_events = set(events[dst])
+            drop = [e for e in events[dst] if e not in src_events]
+            # Dedupe events found in multiple sources, keeping source order.
+            add = [e for e in dict.fromkeys(e for src in srcs for e in events[src]) if e not in dst_events]
+            events[dst] = [e for e in events[dst] if e in src_events]
             for event in drop:
                 logging.info(f'Drop: {event["summary"]}')
-                self.events[dst].remove(event)
-                event.delete()
+                mutations.append((event.delete_request(), functools.partial(self.deleted, event)))
             for event in add:
                 logging.info(f'Add: {event.get("summary", None)}')
-                if event.add(dst):
-                    self.events[dst].append(event)
+                if event.should_add(dst, dst_events):
+                    dst_events.add(event)
+                    mutations.append((event.insert_request(dst), functools.partial(self.added, dst, event)))
+        # Send all the deletes and inserts in as few requests as possible.
+        self.execute_batched(mutations)
+
+    def deleted(self, event: Event, request_id: str, response: dict, exception: Optional[Exception]) -> None:
+        """Handle the result of a batched event delete."""
+        if exception is not None:
+            logging.warning(f'Failed to drop {event.get("summary", None)}: {exception}')
+
+    def added(self, dst: Calendar, event: Event, request_id: str, response: dict, exception: Optional[Exception]) -> None:
+        """Handle the result of a batched event insert, tracking the created event."""
+        if exception is not None:
+            logging.warning(f'Failed to add {event.get("summary", None)}: {exception}')
+            return
+        self.events[dst].append(Event(response, self.service))
 
 
 class AggApp:
@@ -325,21 +640,23 @@ class AggApp:
 
     def __init__(self, config_file: str) -> None:
         """Initialize."""
-        self.config = json.loads(pathlib.Path(config_file).read_text())
+        self.config = orjson.loads(pathlib.Path(config_file).read_bytes())
 
         self._credentials = None
         self._resource = None
+        self._auth_request = Request()
+        # One keep-alive connection pool shared by every Resource built.
+        self._http = httplib2.Http()
         self.refresh_count = 0
+        # Calendars with a sync waiting out the debounce delay, and the running background tasks.
+        self.sync_pending: set[str] = set()
+        self.tasks: set[asyncio.Task] = set()
 
         self.service()
 
     async def webhook(self, request: aiohttp.web.Request) -> aiohttp.web.Response:
         """Handle HTTP requests."""
-        expected_headers = (
-            "X-Goog-Channel-ID", "X-Goog-Resource-ID",
-            "X-Goog-Resource-State", "X-Goog-Channel-Token",
-        )
-        has_headers = all(h in request.headers for h in expected_headers)
+        has_headers = all(h in request.headers for h in WEBHOOK_HEADERS)
         msg = f"Income request: {request.scheme.upper()} {request.method} {request.host}. "
         msg += f"{has_headers=}"
         logging.debug(msg)
@@ -347,67 +664,144 @@ class AggApp:
             return aiohttp.web.Response(text="NACK")
 
         cid = request.headers["X-Goog-Channel-Token"]
-        name = self.config["sources"][cid]["name"]
         gca = request.app["gca"]
+        cal = gca.cal_by_cid.get(cid)
+        if cal is None:
+            logging.warning(f"No calendar with CID {cid}")
+            return aiohttp.web.Response(text="NACK")
+        name = self.config["sources"][cid]["name"]
 
         if request.headers["X-Goog-Resource-State"] == "sync":
             logging.info(f"=> SYNC: watching events {name=}")
-            c = [c for c in gca.src_cals if c.cid == cid][0]
-            if c.watch_token['id'] != request.headers["X-Goog-Channel-ID"]:
+            body = {
+                "id": request.headers["X-Goog-Channel-ID"],
+                "resourceId": request.headers["X-Goog-Resource-ID"],
+            }
+            self.background(self.check_channel(gca, cal, body))
+        elif request.headers["X-Goog-Resource-State"] == "exists":
+            logging.info(f"=> EXISTS: event updated {name=}; sync calendar.")
+            self.background(self.debounced_sync(gca, cal))
+        # ACK right away; Google retries notifications which are slow to answer.
+        return aiohttp.web.Response(text="ACK")
+
+    def background(self, coro: Coroutine) -> None:
+        """Run a coroutine as a task, holding a reference until it is done."""
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def check_channel(self, gca: GCalAggregator, cal: Calendar, channel: dict) -> None:
+        """Stop a watch channel which is not the calendar's current one."""
+        try:
+            # Wait out any in-flight watch renewal so its new channel ID is known.
+            async with gca.lock:
+                if cal.watch_token is not None and cal.watch_token["id"] == channel["id"]:
+                    return
                 logging.warning("==> Uncontrolled watch channel! Unsubscribing.")
-                body = {
-                    "id": request.headers["X-Goog-Channel-ID"],
-                    "resourceId": request.headers["X-Goog-Resource-ID"],
-                }
                 try:
-                    self.service().channels().stop(body=body).execute()
+                    await asyncio.to_thread(self.service().channels().stop(body=channel).execute)
                 except googleapiclient.errors.HttpError:
                     pass
-        elif request.headers["X-Goog-Resource-State"] == "exists":
-            cals = [c for c in gca.src_cals if c.cid == cid]
-            if len(cals) != 1:
-                logging.warning("No calendar with CID", cid)
-                return aiohttp.web.Response(text="NACK")
-            cal = cals[0]
-            logging.info(f"=> EXISTS: event updated {name=}; sync calendar.")
+        except Exception:
+            logging.exception(f"Failed to check watch channel for {cal.name}")
+
+    async def debounced_sync(self, gca: GCalAggregator, cal: Calendar) -> None:
+        """Sync a calendar after a short delay, coalescing a burst of notifications into one sync."""
+        if cal.cid in self.sync_pending:
+            return
+        self.sync_pending.add(cal.cid)
+        await asyncio.sleep(SYNC_DEBOUNCE)
+        # Notifications from here on need a new sync, since this one may not see their changes.
+        self.sync_pending.discard(cal.cid)
+        try:
             await gca.sync_calendar(cal)
-        return aiohttp.web.Response(text="ACK")
+        except Exception:
+            logging.exception(f"Failed to sync {cal.name}")
 
     async def watch_calendars(self, app: aiohttp.web.Application) -> None:
         """Watch calendars, renewing as needed."""
         gca = app["gca"]
-        for cal in gca.src_cals:
-            cal.watch()
+        # Heap of (expiration in ms, calendar ID), soonest expiration first.
+        expirations: list[tuple[int, str]] = []
+        watched: set[str] = set()
+        # Reloads can add or drop sources; check for them at least this often.
+        poll_time = self.config.get("poll_time", SAFETY_POLL)
+
+        async def renew(cals: list[Calendar]) -> None:
+            # One batch for all the calendars, off the event loop so webhooks are still served.
+            try:
+                async with gca.lock:
+                    failed = await asyncio.to_thread(gca.batch_watch, cals)
+            except Exception:
+                # The whole batch failed; retry every calendar in it.
+                logging.exception("Failed to renew watches")
+                failed = list(cals)
+            for cal in cals:
+                if cal in failed or cal.watch_token is None:
+                    # Retry failed watches in a few minutes; any old watch is still live.
+                    expiration = int((time.time() + 300 + WATCH_RENEW_EARLY) * 1000)
+                else:
+                    expiration = int(cal.watch_token["expiration"])
+                heapq.heappush(expirations, (expiration, cal.cid))
+                watched.add(cal.cid)
+
+        await renew(list(gca.src_cals))
         while True:
-            next_expire = min(int(cal.watch_token["expiration"]) for cal in gca.src_cals)
-            delay = int(next_expire / 1000 - time.time())
-            # Wake up a bit before the watch expires.
-            delay = max(0, delay - 10)
-            await asyncio.sleep(delay)
-            for cal in gca.src_cals:
-                # Renew watches that expired or are about to expire.
-                if int(cal.watch_token["expiration"]) < time.time() + 60:
-                    cal.watch()
+            # Wake up well before the watch expires, leaving time to retry a failed renewal.
+            if expirations:
+                delay = int(expirations[0][0] / 1000 - time.time()) - WATCH_RENEW_EARLY
+            else:
+                delay = poll_time
+            await asyncio.sleep(min(max(60, delay), poll_time))
+            # Renew watches that are close to expiring, grouping nearby expirations in one batch.
+            expiring = []
+            while expirations and expirations[0][0] < (time.time() + WATCH_RENEW_EARLY + 600) * 1000:
+                _, cid = heapq.heappop(expirations)
+                if (cal := gca.cal_by_cid.get(cid)) is None:
+                    # No longer a source after a reload; let its watch lapse.
+                    watched.discard(cid)
+                    continue
+                expiring.append(cal)
+            # Watch sources found by a reload.
+            expiring.extend(cal for cal in gca.src_cals if cal.cid not in watched)
+            if expiring:
+                await renew(expiring)
 
     async def load_and_sync(self, app: aiohttp.web.Application) -> None:
         """Load calendar data and do a sync."""
         gca = app["gca"]
-        gca.load_calendars()
-        gca.sync_calendars()
+        async with gca.lock:
+            await gca.load_calendars()
+            await asyncio.to_thread(gca.sync_calendars)
+
+    async def safety_poll(self, app: aiohttp.web.Application) -> None:
+        """Periodically reload and sync all calendars in case a notification was missed."""
+        gca = app["gca"]
+        while True:
+            await asyncio.sleep(self.config.get("poll_time", SAFETY_POLL))
+            # Sync tokens keep this cheap: only changed events are fetched.
+            try:
+                async with gca.lock:
+                    await gca.load_calendars()
+                    await asyncio.to_thread(gca.sync_calendars)
+            except Exception:
+                logging.exception("Safety poll failed; retrying on the next poll")
 
     async def start_watches(self, app: aiohttp.web.Application) -> None:
-        """Create a watch task."""
+        """Create the watch and safety poll tasks."""
         app["watcher"] = asyncio.create_task(self.watch_calendars(app))
+        app["poller"] = asyncio.create_task(self.safety_poll(app))
 
     async def stop_watches(self, app: aiohttp.web.Application) -> None:
         """Stop all calendar watches."""
         for cal in app["gca"].src_cals:
             cal.watch_stop()
         app["watcher"].cancel()
+        app["poller"].cancel()
 
     def once(self) -> None:
         gca = GCalAggregator(self.service, self.config)
-        gca.load_calendars()
+        asyncio.run(gca.load_calendars())
         gca.sync_calendars()
 
     def run(self) -> None:
@@ -427,31 +821,33 @@ class AggApp:
 
     def service(self) -> Resource:
         """Return a valid calendar Resource."""
-        file = self.config["service_file"]
         if self._credentials is None:
-            self._credentials = service_account.Credentials.from_service_account_file(
-                file, scopes=SCOPES
-            )
-            self._resource = build("calendar", "v3", credentials=self._credentials)
-
-        if self._credentials.valid:
-            assert not self._credentials.expired
-            return self._resource
-
-        if self._credentials.expired:
+            self.load_service()
+        elif self._credentials.expired:
             self.refresh_count += 1
             logging.info(f"Refresh count {self.refresh_count}")
             try:
-                self._credentials.refresh(Request())
+                # Refreshing in place keeps the existing Resource valid.
+                self._credentials.refresh(self._auth_request)
             except RefreshError:
-                self._credentials = service_account.Credentials.from_service_account_file(
-                    file, scopes=SCOPES
-                )
+                self.load_service()
+        return self._resource
 
+    def load_service(self) -> None:
+        """Load credentials from the service file and build a Resource using them."""
+        self._credentials = service_account.Credentials.from_service_account_file(
+            self.config["service_file"], scopes=SCOPES
+        )
         if "delegation" in self.config:
             self._credentials = self._credentials.with_subject(self.config["delegation"])
-        self._resource = build("calendar", "v3", credentials=self._credentials)
-        return self._resource
+        # Use the discovery document bundled with googleapiclient rather than fetching it.
+        self._resource = build(
+            "calendar",
+            "v3",
+            http=google_auth_httplib2.AuthorizedHttp(self._credentials, http=self._http),
+            model=OrjsonModel(),
+            static_discovery=True,
+        )
 
 
 @click.command()
@@ -459,11 +855,18 @@ class AggApp:
 @click.argument("config", envvar="CONFIG", type=click.Path(exists=True))
 def main(config, once):
     """Entry point."""
-    logging.basicConfig(level=logging.INFO)
-    if once:
-        AggApp(config).once()
-    else:
-        AggApp(config).run()
+    # Log through a queue so writing to stderr never blocks the event loop.
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.QueueHandler(log_queue)])
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+    listener.start()
+    try:
+        if once:
+            AggApp(config).once()
+        else:
+            AggApp(config).run()
+    finally:
+        listener.stop()
 
 
 if __name__ == "__main__":
@@ -5,6 +5,24 @@
 # Users can send "start" or "stop" to be added to/removed from a list of "registered" nicks.
 # The "owner" can PM a "SEND foo" command and the bot will send "foo" to all registered nicks.
 
+# Max bytes in an IRC line, including the trailing CRLF.
+line_limit = 512
+
+def Broadcast(server, nicks, payload):
+  # Send to as many nicks per PRIVMSG as the target and line limits allow.
+  # Each line sent is throttled, so fewer lines is a faster announcement.
+  # The server advertises its target limit (TARGMAX) on connect.
+  max_targets = server.maxTargets
+  group = []
+  for n in nicks:
+    line = 'PRIVMSG {} :{}\r\n'.format(','.join(group + [n]), payload)
+    if group and (len(group) == max_targets or len(line.encode()) > line_limit):
+      server.msg(','.join(group), payload)
+      group = []
+    group.append(n)
+  if group:
+    server.msg(','.join(group), payload)
+
 def init(server, storage):
   # Set up the storage only if it's not yet defined.
   # Otherwise, don't override existing settings.
@@ -33,15 +51,15 @@ def hookCode(server, data, storage):
       server.msg(user, 'You have been removed')
     else:
       server.msg(user, 'You were not registered')
-  elif message[0:4] == 'SEND':
+  elif message.startswith('SEND '):
     # Announce info on "SEND" but only from the owner
     if identified and user == owner:
-      for n in nicks:
-        server.msg(n, message[5:])
+      Broadcast(server, nicks, message[5:])
     else:
       server.msg(user, 'You cannot use that command')
 
 name = 'Announce'
 types = ['PRIVMSG']
+commands = ['start', 'stop', 'SEND']
 
 # vim:expandtab:sw=2:ts=2
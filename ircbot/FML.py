@@ -1,38 +1,69 @@
 #! /usr/bin/python
 
+import collections
+import threading
+
 import feedparser
 
 name = 'FML'
 desc = 'Display FML entries'
 types = ['PUBMSG']
+commands = ['.fml']
 fml_url = 'http://feedpress.me/fmylife'
+# Seconds between background feed refreshes.
+refresh_interval = 15 * 60
+
+def FetchFreshEntries(state):
+  # Send the last ETag/Last-Modified so an unchanged feed is a cheap 304.
+  feed = feedparser.parse(fml_url, etag=state.get('etag'), modified=state.get('modified'))
+  # A 304 has nothing new, and a failed fetch comes back as a bozo result without entries.
+  # Keep the current entries and validators in both cases.
+  if feed.get('status') != 200 and (not feed.entries or feed.get('bozo')):
+    return None
+  state['etag'] = feed.get('etag')
+  state['modified'] = feed.get('modified')
+  return feed.entries
 
-def FetchFreshEntries():
-  feed = feedparser.parse(fml_url)
-  entries = feed.entries
-  entries.reverse()
-  return entries
+def UnseenEntries(state, entries):
+  # Filter once here so popping an entry never has to skip shown ones.
+  return collections.deque(e for e in entries if e.id not in state['shown_entries'])
+
+def Refresher(server, storage, state):
+  # Keep the entries fresh in the background so .fml never waits on the network.
+  # Stop once this module is re-initialized, unloaded or reloaded.
+  while True:
+    state['wanted'].wait(refresh_interval)
+    state['wanted'].clear()
+    if state['stopped'].is_set() or server.callbackData.get(name) is not storage:
+      return
+    entries = FetchFreshEntries(state)
+    if entries is not None:
+      with state['lock']:
+        state['entries'] = UnseenEntries(state, entries)
 
 def init(server, storage):
-  storage[name] = {'entries': FetchFreshEntries(), 'shown_entries': set()}
+  if name in storage:
+    storage[name]['stopped'].set()
+    storage[name]['wanted'].set()
+  state = {'shown_entries': set(), 'lock': threading.Lock(), 'wanted': threading.Event(), 'stopped': threading.Event()}
+  state['entries'] = UnseenEntries(state, FetchFreshEntries(state) or [])
+  storage[name] = state
+  threading.Thread(target=Refresher, args=(server, storage, state), daemon=True).start()
 
 def PopNewEntry(storage):
-  while storage[name]['entries']:
-    entry = storage[name]['entries'].pop()
-    if entry.id in storage[name]['shown_entries']:
-      continue
-    storage[name]['shown_entries'].add(entry.id)
-    content = entry.content[0].value[3:-4]
-    return content
-  return None
+  if not storage[name]['entries']:
+    return None
+  entry = storage[name]['entries'].popleft()
+  storage[name]['shown_entries'].add(entry.id)
+  content = entry.content[0].value[3:-4]
+  return content
 
 def GetFML(storage):
-  entry = PopNewEntry(storage)
-  if entry is None:
-    # print('Ran out of FML entries; fetching new entries.')
-    storage[name]['entries'] = FetchFreshEntries()
+  with storage[name]['lock']:
     entry = PopNewEntry(storage)
   if entry is None:
+    # Ran out of FML entries; have the refresher fetch new entries now.
+    storage[name]['wanted'].set()
     entry = 'We are clean out of fresh FMLs. Try again later.'
   entry = entry.encode('ascii', 'replace')
   return entry.decode('ascii')
@@ -55,6 +86,7 @@ if __name__ == '__main__':
   d['User'] = {}
   d['User']['Nick'] = 'me'
   storage = {}
+  s.callbackData = {name: storage}
   init(s, storage)
   for i in range(5):
     hookCode(s, d, storage)
@@ -4,17 +4,21 @@ import os
 import psutil
 import time
 
+# The process and the details which never change are looked up once, at load time.
+p = psutil.Process(os.getpid())
+static_info = [
+	"PID [{}] PPID [{}]".format ( p.pid, p.ppid ),
+	"Name [{}] cmd [{}] ran by [{}]".format ( p.name, p.cmdline, p.username ),
+	"Running since {}".format ( time.strftime ( "%Y-%m-%d %H:%M:%S", time.localtime ( p.create_time ) ) ),
+]
+
 def hookCode ( server, data ):
 	if not data['CTCP']:
 		return
 	if data['CTCP Command'] != 'INFO':
 		return
 
-	p = psutil.Process(os.getpid())
-	info = []
-	info.append ( "PID [{}] PPID [{}]".format ( p.pid, p.ppid ) )
-	info.append ( "Name [{}] cmd [{}] ran by [{}]".format ( p.name, p.cmdline, p.username ) )
-	info.append ( "Running since {}".format ( time.strftime ( "%Y-%m-%d %H:%M:%S", time.localtime ( p.create_time ) ) ) )
+	info = list ( static_info )
 	( rss, vm ) = p.get_memory_info()
 	info.append ( "Memory: RSS {} VM {}".format ( rss, vm ) )
 
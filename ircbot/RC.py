@@ -11,3 +11,5 @@ def hookCode ( server, data, storage ):
 name = 'RC'
 
 types = [ 'PRIVMSG' ]
+
+commands = [ 'RC' ]
@@ -4,6 +4,9 @@ import random
 
 random.seed()
 
+# Most dice in one roll, so a huge roll can't stall the bot.
+maxDice = 1000
+
 def hookCode ( server, data, storage ):
 	parts = data['Message'].split()
 	if parts[0] == '.roll':
@@ -12,10 +15,13 @@ def hookCode ( server, data, storage ):
 		elif len ( parts ) == 2:
 			server.msg ( data['Channel'], "{}: you rolled a {}".format ( data['User']['Nick'], random.randint ( 1, int ( parts[1] ) ) ) )
 		elif len ( parts ) == 3:
-			sum = 0
-			for x in range ( int ( parts[1] ) ):
-				sum += random.randint ( 1, int ( parts[2] ) )
-			server.msg ( data['Channel'], "{}: you rolled a {}".format ( data['User']['Nick'], sum ) )
+			count = int ( parts[1] )
+			if count > maxDice:
+				server.msg ( data['Channel'], "{}: you can roll at most {} dice".format ( data['User']['Nick'], maxDice ) )
+				return
+			# One choices() call draws every die instead of a randint() call per die
+			total = sum ( random.choices ( range ( 1, int ( parts[2] ) + 1 ), k = count ) )
+			server.msg ( data['Channel'], "{}: you rolled a {}".format ( data['User']['Nick'], total ) )
 
 name = 'Roll'
 
@@ -23,6 +29,8 @@ desc = 'Dice rolling'
 
 types = [ 'PUBMSG' ]
 
+commands = [ '.roll' ]
+
 # Debug code
 if __name__ == '__main__':
 	class dummy:
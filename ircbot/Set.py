@@ -38,6 +38,8 @@ desc = 'Tweak settings'
 
 types = [ 'PRIVMSG' ]
 
+commands = [ 'set' ]
+
 # Debug code
 if __name__ == '__main__':
   class dummy:
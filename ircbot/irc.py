@@ -21,12 +21,16 @@ class Server:
     self.nick = nick
     self.callbacks = {}
     self.callbackData = {}
+    # Hooks which only handle messages starting with certain words, by hook name
+    self.callbackCommands = {}
     self._nickMask = re.compile ( '.+!.+@.+' )
     self.lastSend = 0
     self.flowSpeed = 0.2
     self.channels = {}
     self.conf = conf
     self.confLoaded = False
+    # PRIVMSG targets per line, from the 005 (RPL_ISUPPORT) TARGMAX/MAXTARGETS token; None is unlimited
+    self.maxTargets = 1
 
     # This one hook is integral to the workings of IRC so it's seperate
     self.addHook ( 'PING', 'PING', ( lambda s, d, n: s.send ( 'PONG ' + d['Server'] ) ) )
@@ -92,6 +96,18 @@ class Server:
     elif parts[0] == 'ERROR':
       raise Exception ( "IRC Error" )
 
+    # RPL_ISUPPORT advertises server limits as KEY=value tokens
+    elif parts[1] == '005':
+      for token in parts[3:]:
+        key, _, value = token.partition ( '=' )
+        if key == 'MAXTARGETS':
+          self.maxTargets = int ( value ) if value else None
+        elif key == 'TARGMAX':
+          for limit in value.split ( ',' ):
+            command, _, count = limit.partition ( ':' )
+            if command == 'PRIVMSG':
+              self.maxTargets = int ( count ) if count else None
+
     elif parts[1] == 'MODE':
       if parts[0] == self.nick and parts[2] == self.nick:
         self.loadConfig()
@@ -279,11 +295,14 @@ class Server:
     self.addHook ( '_Quit', 'PRIVMSG', quitCommand )
     self.addHook ( '_Say', 'PRIVMSG', sayCommand )
 
-  def addHook ( self, cName, cType, cCode ):
+  def addHook ( self, cName, cType, cCode, cCommands = None ):
     """Set up a callback hook to specific code on a specific type of message"""
+    # With cCommands, the hook only sees messages whose first word is one of them
     if not cType in self.callbacks:
       self.callbacks[ cType ] = {}
     self.callbacks[ cType ][ cName ] = cCode
+    if cCommands:
+      self.callbackCommands[ cName ] = frozenset ( cCommands )
 
     # Add data storage for the callback
     if cName not in self.callbackData:
@@ -294,12 +313,18 @@ class Server:
     for cType in self.callbacks:
       if name in self.callbacks[ cType ]:
         del ( self.callbacks[ cType ][ name ] )
+    if name in self.callbackCommands:
+      del ( self.callbackCommands[ name ] )
 
   def dispatch ( self, data ):
     """Send the data to a user defined function to act upon it"""
     mType = data['Type']
     if mType in self.callbacks:
-      names = [ x for x in self.callbacks[ mType ] ]
+      # Split once here rather than in every hook, and skip hooks for other commands
+      words = data.get ( 'Message', '' ).split ( None, 1 )
+      command = words[0] if words else ''
+      commands = self.callbackCommands
+      names = [ x for x in self.callbacks[ mType ] if x not in commands or command in commands[ x ] ]
       for name in names:
         try:
           self.callbacks[ mType ][ name ]( self, data, self.callbackData[ name ] )
@@ -327,7 +352,7 @@ class Server:
     # Add callback hooks
     try:
       for cType in module.types:
-        self.addHook ( module.name, cType, module.hookCode )
+        self.addHook ( module.name, cType, module.hookCode, getattr ( module, 'commands', None ) )
     except AttributeError as e:
       self.unload ( module.name )
       print ( "W " + "Failed to load {} because it is missing values: {}".format( name, e ) )